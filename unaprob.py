@@ -1,10 +1,11 @@
 import random
-import math
 import numpy as np
 import time
 import os
 from enum import Enum, auto
-from PIL import Image, ImageDraw, ImageFont
+from functools import cached_property
+from PIL import GifImagePlugin, Image, ImageChops, ImageDraw, ImageFont
+from numba import njit, prange
 
 # Get the current directory to save the GIF
 current_dir = os.getcwd()
@@ -25,12 +26,38 @@ class CircuitComponent:
         self.state = ComponentState.OFF
         self.inputs = []
         self.outputs = []
+        self._typed_inputs = {}
         self.probability = 1.0
         self.time_coordinate = 0.0
         
     def add_input(self, component):
         self.inputs.append(component)
         component.outputs.append(self)
+        # Index inputs under every class they are an instance of, once at wiring
+        # time, so update() can skip isinstance scans and still see subclasses
+        for cls in type(component).__mro__:
+            self._typed_inputs.setdefault(cls, []).append(component)
+        # The wiring changed, so drop the bound input check; the next update() rebinds it
+        self.__dict__.pop('_input_condition', None)
+        
+    @cached_property
+    def _input_condition(self):
+        """The input check for the current wiring, bound on first use"""
+        return self._bind_inputs()
+        
+    def _bind_inputs(self):
+        """Return a closure over the current inputs that update() calls instead of scanning them"""
+        return lambda: False
+    
+    def _watch(self, component_type, state):
+        """Return a closure telling whether any input of component_type is in state"""
+        sources = tuple(self._typed_inputs.get(component_type, ()))
+        if not sources:
+            return lambda: False
+        if len(sources) == 1:
+            source, = sources
+            return lambda: source.state is state
+        return lambda: any(c.state is state for c in sources)
         
     def update(self, dt):
         pass
@@ -53,12 +80,14 @@ class LED(CircuitComponent):
         self.brightness = 0.0
         self.color = "red"
         
-    def update(self, dt):
-        power_on = any(input_comp.state == ComponentState.ON for input_comp in self.inputs)
-        button_pressed = any(isinstance(input_comp, PowerButton) and input_comp.state == ComponentState.CLOSED 
-                            for input_comp in self.inputs)
+    def _bind_inputs(self):
+        # Any input that is ON counts as power, not just a PowerSource
+        power_on = self._watch(CircuitComponent, ComponentState.ON)
+        button_pressed = self._watch(PowerButton, ComponentState.CLOSED)
+        return lambda: power_on() and button_pressed()
         
-        if power_on and button_pressed:
+    def update(self, dt):
+        if self._input_condition():
             self.state = ComponentState.ON
             self.brightness = 1.0
         else:
@@ -72,13 +101,13 @@ class Phototransistor(CircuitComponent):
         super().__init__(name)
         self.sensitivity = 0.8
         
-    def update(self, dt):
-        led_on = any(isinstance(input_comp, LED) and input_comp.state == ComponentState.ON 
-                    for input_comp in self.inputs)
-        power_on = any(isinstance(input_comp, PowerSource) and input_comp.state == ComponentState.ON 
-                     for input_comp in self.inputs)
+    def _bind_inputs(self):
+        led_on = self._watch(LED, ComponentState.ON)
+        power_on = self._watch(PowerSource, ComponentState.ON)
+        return lambda: led_on() and power_on()
         
-        if led_on and power_on:
+    def update(self, dt):
+        if self._input_condition():
             self.state = ComponentState.ACTIVE
         else:
             self.state = ComponentState.INACTIVE
@@ -90,10 +119,13 @@ class Resistor(CircuitComponent):
         super().__init__(name)
         self.resistance = resistance
         
-    def update(self, dt):
-        quantum_box = any(input_comp.name == "Quantum Box" for input_comp in self.inputs)
+    def _bind_inputs(self):
+        # Only whether a quantum box is wired in matters, which is fixed per wiring
+        quantum_box = QuantumBox in self._typed_inputs
+        return lambda: quantum_box
         
-        if quantum_box:
+    def update(self, dt):
+        if self._input_condition():
             self.state = ComponentState.ACTIVE
         else:
             self.state = ComponentState.INACTIVE
@@ -110,11 +142,11 @@ class PowerButton(CircuitComponent):
         self.pressed = not self.pressed
         self.state = ComponentState.CLOSED if self.pressed else ComponentState.OPEN
         
-    def update(self, dt):
-        power_on = any(isinstance(input_comp, PowerSource) and input_comp.state == ComponentState.ON 
-                     for input_comp in self.inputs)
+    def _bind_inputs(self):
+        return self._watch(PowerSource, ComponentState.ON)
         
-        if not power_on:
+    def update(self, dt):
+        if not self._input_condition():
             self.state = ComponentState.OPEN
             self.pressed = False
             
@@ -124,12 +156,14 @@ class TunnelDiode(CircuitComponent):
     def __init__(self, name="Tunnel Diode"):
         super().__init__(name)
         self.tunnel_probability = 0.3
+        # Source of uniform [0, 1) draws; the simulation swaps in a seeded one
+        self.draw = random.random
         
-    def update(self, dt):
-        button_active = any(isinstance(input_comp, PowerButton) and input_comp.state == ComponentState.CLOSED 
-                          for input_comp in self.inputs)
+    def _bind_inputs(self):
+        return self._watch(PowerButton, ComponentState.CLOSED)
         
-        if button_active and random.random() < self.tunnel_probability:
+    def update(self, dt):
+        if self._input_condition() and self.draw() < self.tunnel_probability:
             self.state = ComponentState.ACTIVE
         else:
             self.state = ComponentState.INACTIVE
@@ -140,24 +174,80 @@ class DetermineSelection(CircuitComponent):
     def __init__(self, name="Determine Selection"):
         super().__init__(name)
         
-    def update(self, dt):
-        phototransistor_active = any(isinstance(input_comp, Phototransistor) and 
-                                    input_comp.state == ComponentState.ACTIVE 
-                                    for input_comp in self.inputs)
+    def _bind_inputs(self):
+        return self._watch(Phototransistor, ComponentState.ACTIVE)
         
-        if phototransistor_active:
+    def update(self, dt):
+        if self._input_condition():
             self.state = ComponentState.ACTIVE
         else:
             self.state = ComponentState.INACTIVE
             
         self.time_coordinate += dt
 
+# No fastmath here: it would turn the divisions into reciprocal multiplies,
+# which can leave the brightest cell just below 1.0 and shift its color
+@njit(cache=True, nogil=True)
+def _fill_probability_field(x_row, y_col, p, t, out_field):
+    """Write the normalized |sin(5x + t) * cos(5y + p)|^2 field into out_field"""
+    # The field is an outer product, so square and normalize the two 1-D
+    # factors (max of the product = product of the maxes) and fill it in one pass
+    s = np.sin(x_row + t)
+    s *= s
+    c = np.cos(y_col + p)
+    c *= c
+    s_max = s.max()
+    c_max = c.max()
+    if s_max > 0 and c_max > 0:
+        s /= s_max
+        c /= c_max
+    np.multiply(c[:, None], s[None, :], out_field)
+
+@njit(cache=True, fastmath=True, nogil=True)
+def _qbox_step(p, t, dt, determine_active, tunnel_active):
+    """Advance the quantum box by dt.
+    
+    Returns (p, t, stopped, p_reset, t_reset, old_p, old_t).
+    """
+    old_t = t
+    t += dt * 0.5
+    
+    old_p = p
+    if determine_active:
+        p += 0.05
+    if tunnel_active:
+        p -= 0.05
+        
+    if abs(p - 1.0) < 0.05 and abs(t - 1.0) < 0.05:
+        return 1.0, 1.0, True, False, False, old_p, old_t
+        
+    p_reset = False
+    t_reset = False
+    
+    if p >= 1.0:
+        old_p = p
+        p = 0.5
+        p_reset = True
+        
+    if t >= 1.0:
+        old_t = t
+        t = -0.5
+        t_reset = True
+        
+    p = max(-1.0, p)
+    t = max(-1.0, t)
+    
+    return p, t, False, p_reset, t_reset, old_p, old_t
+
 class QuantumBox(CircuitComponent):
     def __init__(self, name="Quantum Box"):
         super().__init__(name)
         self.p = 0.5  # position coordinate
         self.t = -0.5  # time coordinate
-        self.probability_field = np.zeros((10, 10))
+        # Fixed 10x10 grid: 5*x along the columns and 5*y along the rows
+        self._x = np.linspace(-1, 1, 10) * 5
+        self._y = np.linspace(-1, 1, 10) * 5
+        self.probability_field = np.empty((10, 10))
         self.update_probability_field()
         self.simulation_stopped = False
         self.reset_count = 0
@@ -165,23 +255,16 @@ class QuantumBox(CircuitComponent):
         self.t_reset_count = 0
         
     def update_probability_field(self):
-        x = np.linspace(-1, 1, 10)
-        y = np.linspace(-1, 1, 10)
-        X, Y = np.meshgrid(x, y)
+        _fill_probability_field(self._x, self._y, self.p, self.t, self.probability_field)
         
-        wave_function = np.sin(5 * X + self.t) * np.cos(5 * Y + self.p)
-        self.probability_field = np.abs(wave_function)**2
-        self.probability_field = self.probability_field / np.max(self.probability_field) if np.max(self.probability_field) > 0 else self.probability_field
+    def _bind_inputs(self):
+        determine_active = self._watch(DetermineSelection, ComponentState.ACTIVE)
+        tunnel_active = self._watch(TunnelDiode, ComponentState.ACTIVE)
+        return lambda: (determine_active(), tunnel_active())
         
     def update(self, dt):
-        determine_active = any(isinstance(input_comp, DetermineSelection) and 
-                             input_comp.state == ComponentState.ACTIVE 
-                             for input_comp in self.inputs)
-        
-        tunnel_active = any(isinstance(input_comp, TunnelDiode) and 
-                          input_comp.state == ComponentState.ACTIVE 
-                          for input_comp in self.inputs)
-                          
+        determine_active, tunnel_active = self._input_condition()
+        
         if self.simulation_stopped:
             if self.p > 0:
                 self.state = ComponentState.ACTIVE
@@ -189,36 +272,19 @@ class QuantumBox(CircuitComponent):
                 self.state = ComponentState.INACTIVE
             return
             
-        old_t = self.t
-        self.t += dt * 0.5
-        
-        old_p = self.p
-        if determine_active:
-            self.p += 0.05
-        if tunnel_active:
-            self.p -= 0.05
+        # Numeric work happens in the compiled kernel; bookkeeping and output stay here
+        self.p, self.t, stopped, p_reset, t_reset, old_p, old_t = _qbox_step(
+            self.p, self.t, dt, determine_active, tunnel_active)
             
-        if abs(self.p - 1.0) < 0.05 and abs(self.t - 1.0) < 0.05:
+        if stopped:
             self.simulation_stopped = True
-            self.p = 1.0
-            self.t = 1.0
             print(f"\n*** FINAL STATE REACHED: p = {self.p:.2f}, t = {self.t:.2f} ***")
             print(f"*** After {self.reset_count} total resets ({self.p_reset_count} p-resets, {self.t_reset_count} t-resets) ***")
             return
-            
-        p_reset = False
-        t_reset = False
         
-        if self.p >= 1.0:
-            old_p = self.p
-            self.p = 0.5
-            p_reset = True
+        if p_reset:
             self.p_reset_count += 1
-            
-        if self.t >= 1.0:
-            old_t = self.t
-            self.t = -0.5
-            t_reset = True
+        if t_reset:
             self.t_reset_count += 1
         
         if p_reset or t_reset:
@@ -231,10 +297,8 @@ class QuantumBox(CircuitComponent):
                 
             reset_str = " and ".join(reset_type)
             print(f"\n*** RESET #{self.reset_count}: {reset_str} ***")
-            
-        self.p = max(-1.0, self.p)
-        self.t = max(-1.0, self.t)
         
+        # t moves every step, so the field is refilled every step
         self.update_probability_field()
         
         if self.p > 0:
@@ -244,8 +308,119 @@ class QuantumBox(CircuitComponent):
             
         self.time_coordinate += dt
 
+# Colors used by the frame kernel; bar colors are indexed by the active flag
+_BAR_COLORS = np.array([(200, 0, 0), (0, 150, 0)], dtype=np.uint8)
+_OUTLINE_COLOR = np.array([0, 0, 0], dtype=np.uint8)
+_GRID_COLOR = np.array([200, 200, 200], dtype=np.uint8)
+_CROSSHAIR_COLOR = np.array([255, 0, 0], dtype=np.uint8)
+_BOUNDARY_COLOR = np.array([0, 0, 255], dtype=np.uint8)
+
+@njit(inline='always')
+def _fill_rect(canvas, y0, y1, x0, x1, color):
+    """Fill canvas[y0:y1, x0:x1] with color"""
+    for y in range(y0, y1):
+        for x in range(x0, x1):
+            canvas[y, x, 0] = color[0]
+            canvas[y, x, 1] = color[1]
+            canvas[y, x, 2] = color[2]
+
+@njit(parallel=True, cache=True, nogil=True)
+def _render_frame(canvas, bg, field_rgb, field_box, active_flags, bar_specs, p_pixel, t_pixel):
+    """Draw every solid-colored part of a frame into canvas.
+    
+    field_box is (x, y, cell_size) of the probability field, whose cells are
+    colored by field_rgb. Each row of bar_specs is (x0, x1, base, active_top,
+    inactive_top) for the bar with the matching active flag. Loops are
+    written out element-wise, which numba compiles far better than
+    broadcast slice assignments.
+    """
+    # Start from the background
+    flat = canvas.reshape(-1)
+    bg_flat = bg.reshape(-1)
+    for i in prange(flat.shape[0]):
+        flat[i] = bg_flat[i]
+        
+    # Component bars with a 1px outline
+    for i in range(bar_specs.shape[0]):
+        x0 = bar_specs[i, 0]
+        x1 = bar_specs[i, 1]
+        base = bar_specs[i, 2]
+        top = bar_specs[i, 3] if active_flags[i] else bar_specs[i, 4]
+        _fill_rect(canvas, top, base + 1, x0, x1 + 1, _OUTLINE_COLOR)
+        _fill_rect(canvas, top + 1, base, x0 + 1, x1, _BAR_COLORS[1 if active_flags[i] else 0])
+        
+    # Upscaled probability field tile
+    fx = field_box[0]
+    fy = field_box[1]
+    cell = field_box[2]
+    n_rows = field_rgb.shape[0]
+    n_cols = field_rgb.shape[1]
+    width = n_cols * cell
+    height = n_rows * cell
+    for r in prange(height):
+        i = r // cell
+        for j in range(n_cols):
+            for x in range(fx + j * cell, fx + (j + 1) * cell):
+                canvas[fy + r, x, 0] = field_rgb[i, j, 0]
+                canvas[fy + r, x, 1] = field_rgb[i, j, 1]
+                canvas[fy + r, x, 2] = field_rgb[i, j, 2]
+            
+    # Cell grid lines
+    for k in range(n_cols + 1):
+        _fill_rect(canvas, fy, fy + height + 1, fx + k * cell, fx + k * cell + 1, _GRID_COLOR)
+    for k in range(n_rows + 1):
+        _fill_rect(canvas, fy + k * cell, fy + k * cell + 1, fx, fx + width + 1, _GRID_COLOR)
+        
+    # p and t coordinate lines, 2px wide with inclusive end points
+    _fill_rect(canvas, fy, fy + height + 1, p_pixel, p_pixel + 2, _CROSSHAIR_COLOR)
+    _fill_rect(canvas, t_pixel, t_pixel + 2, fx, fx + width + 1, _CROSSHAIR_COLOR)
+    
+    # Boundary lines on top of the tile and grid
+    _fill_rect(canvas, fy, fy + height + 1, fx + width, fx + width + 2, _BOUNDARY_COLOR)
+    _fill_rect(canvas, fy, fy + 2, fx, fx + width + 1, _BOUNDARY_COLOR)
+
+class _GifStreamWriter:
+    """Append 'P' frames sharing one palette to an open GIF file as they arrive.
+    
+    Like Pillow's save_all, each frame is cropped to the area that changed
+    since the previous one, and identical consecutive frames are merged into
+    one longer frame. Unlike it, frames are written out as soon as the next
+    one differs, so only the previous frame is ever held.
+    """
+    def __init__(self, fp, duration, loop=0):
+        self.fp = fp
+        self.duration = duration
+        self.loop = loop
+        self._previous = None  # last full frame, to diff the next one against
+        self._pending = None   # [frame or crop, offset, duration] not yet written
+        
+    def append(self, frame):
+        if self._previous is None:
+            # The first frame's palette becomes the global color table
+            header, _ = GifImagePlugin.getheader(frame, info={"loop": self.loop, "duration": self.duration})
+            self.fp.write(b"".join(header))
+            self._pending = [frame, (0, 0), self.duration]
+        else:
+            bbox = ImageChops.subtract_modulo(frame, self._previous).getbbox(alpha_only=False)
+            if bbox is None:
+                self._pending[2] += self.duration
+                return
+            self._write_pending()
+            self._pending = [frame.crop(bbox), bbox[:2], self.duration]
+        self._previous = frame
+        
+    def _write_pending(self):
+        frame, offset, duration = self._pending
+        self.fp.write(b"".join(GifImagePlugin.getdata(frame, offset, duration=duration)))
+        
+    def close(self):
+        if self._pending is None:
+            raise ValueError("cannot write a GIF without frames")
+        self._write_pending()
+        self.fp.write(b";")  # GIF trailer
+
 class CircuitSimulation:
-    def __init__(self):
+    def __init__(self, seed=42):
         self.power_source = PowerSource()
         self.led = LED()
         self.phototransistor = Phototransistor()
@@ -295,9 +470,96 @@ class CircuitSimulation:
         self.frames = []
         self.max_frames = 300
         self.frames_after_final_state = 20
-        
-    def update_simulation(self, dt):
-        if random.random() < 0.02:
+        self.font, self.title_font = self._load_fonts()
+        
+        # The random inputs only depend on the seed. The button and the diode
+        # get independent streams, drawn a block at a time as they run out, so
+        # the path does not depend on how many frames are simulated
+        button_seed, tunnel_seed = np.random.SeedSequence(seed).spawn(2)
+        self._button_rng = np.random.default_rng(button_seed)
+        self._button_press_schedule = []
+        self.tunnel_diode.draw = self._uniform_draws(np.random.default_rng(tunnel_seed)).__next__
+        
+    @staticmethod
+    def _uniform_draws(rng, block=256):
+        """Yield uniform [0, 1) draws from rng without end, generated block at a time"""
+        while True:
+            yield from rng.random(block).tolist()
+            
+    @staticmethod
+    def _load_fonts():
+        """Return (font, title_font), falling back to PIL's default font"""
+        try:
+            # Try to load Arial, a common font
+            return ImageFont.truetype("arial.ttf", 12), ImageFont.truetype("arial.ttf", 16)
+        except OSError:
+            pass
+        try:
+            # Try a default TrueType font that might be on the system
+            return ImageFont.truetype("DejaVuSans.ttf", 12), ImageFont.truetype("DejaVuSans.ttf", 16)
+        except OSError:
+            # Fallback to default
+            return ImageFont.load_default(), ImageFont.load_default()
+        
+    @staticmethod
+    def _build_gif_palette(viridis_lut):
+        """Return a 'P' image holding one fixed 256-color palette for every frame"""
+        def ramp(start, end, n):
+            w = np.linspace(0, 1, n)[:, None]
+            return np.rint(np.array(start) * (1 - w) + np.array(end) * w).astype(np.uint8)
+        
+        # Flat UI colors, then anti-aliasing ramps for text on white and on the banner
+        ui_colors = np.array([(255, 255, 255), (0, 0, 0), (100, 100, 100), (200, 200, 200),
+                              (0, 150, 0), (0, 100, 0), (200, 0, 0), (255, 0, 0), (0, 0, 255)],
+                             dtype=np.uint8)
+        ramps = [ramp((0, 0, 0), (255, 255, 255), 24),
+                 ramp((0, 100, 0), (255, 255, 255), 8),
+                 ramp((0, 150, 0), (255, 255, 255), 8)]
+        # The reset counts are drawn in black over the field's bottom-right
+        # corner, so add ramps from black to the crosshair red and to a few
+        # field colors (end points are already in the palette)
+        ramps.append(ramp((0, 0, 0), (255, 0, 0), 10)[1:-1])
+        ramps.extend(ramp((0, 0, 0), c, 7)[1:-1] for c in viridis_lut[::85])
+        ramps = np.concatenate(ramps)
+        
+        # PIL maps a color to the entry nearest the low corner (c & ~3) of its
+        # 4-wide lookup slot, not to the entry nearest c itself. Drop any
+        # entry at least as near a UI color's corner as that color, or it
+        # would take over the UI color
+        ui_corners = ui_colors.astype(np.int64) & ~3
+        ui_dist = ((ui_colors - ui_corners) ** 2).sum(axis=1)
+        def keeps_ui_exact(colors):
+            dist = ((colors[:, None, :].astype(np.int64) - ui_corners) ** 2).sum(axis=2)
+            return colors[(dist > ui_dist).all(axis=1)]
+        ramps = keeps_ui_exact(ramps)
+        field_candidates = keeps_ui_exact(viridis_lut)
+        
+        # The probability field gets whatever entries are left
+        n_field = 256 - len(ui_colors) - len(ramps)
+        field_colors = field_candidates[np.linspace(0, len(field_candidates) - 1, n_field).round().astype(int)]
+        
+        palette_img = Image.new('P', (1, 1))
+        palette_img.putpalette(np.concatenate([ui_colors, ramps, field_colors]).tobytes())
+        
+        # The bars and background rely on the UI colors coming through unchanged
+        ui_img = Image.frombytes('RGB', (len(ui_colors), 1), ui_colors.tobytes())
+        quantized = np.asarray(ui_img.quantize(palette=palette_img, dither=Image.Dither.NONE).convert('RGB'))
+        if not (quantized[0] == ui_colors).all():
+            raise ValueError("GIF palette does not reproduce every UI color exactly")
+        return palette_img
+        
+    def update_simulation(self, dt, frame_idx):
+        """Advance the circuit by dt as step number frame_idx.
+        
+        Button presses are looked up by frame_idx in a schedule drawn from
+        the seed, so a given index always sees the same press. Any index
+        >= 0 is valid; the schedule is extended as far as it needs to go.
+        """
+        schedule = self._button_press_schedule
+        while frame_idx >= len(schedule):
+            schedule.extend((self._button_rng.random(256) < 0.02).tolist())
+            
+        if schedule[frame_idx]:
             self.power_button.press()
             
         for component in self.components:
@@ -307,175 +569,175 @@ class CircuitSimulation:
         
     def run_simulation_for_gif(self):
         """Run the simulation and generate frames for a GIF"""
-        try:
-            # Try to load a font, with fallbacks
-            try:
-                # Try to load Arial, a common font
-                font = ImageFont.truetype("arial.ttf", 12)
-                title_font = ImageFont.truetype("arial.ttf", 16)
-            except:
-                try:
-                    # Try a default TrueType font that might be on the system
-                    font = ImageFont.truetype("DejaVuSans.ttf", 12)
-                    title_font = ImageFont.truetype("DejaVuSans.ttf", 16)
-                except:
-                    # Fallback to default
-                    font = ImageFont.load_default()
-                    title_font = ImageFont.load_default()
-                    
-            frames = []
-            frame_count = 0
-            final_state_frames = 0
+        font = self.font
+        title_font = self.title_font
+        ON, ACTIVE, CLOSED = ComponentState.ON, ComponentState.ACTIVE, ComponentState.CLOSED
+        
+        # Whether each component's bar is drawn as active, refilled every frame
+        active_flags = np.empty(len(self.components), dtype=np.bool_)
+        
+        frame_count = 0
+        final_state_frames = 0
+        
+        # Viridis-like colormap for the probability field, as a lookup table
+        # indexed by the field value scaled to 8 bits
+        lut_values = np.arange(256) / 255
+        viridis_lut = np.empty((256, 3), dtype=np.uint8)
+        viridis_lut[:, 0] = np.clip(255 * (0.4 + 0.6 * lut_values), 0, 255)
+        viridis_lut[:, 1] = np.clip(255 * (0.2 + 0.8 * np.sqrt(lut_values)), 0, 255)
+        viridis_lut[:, 2] = np.clip(255 * (0.5 + 0.5 * lut_values), 0, 255)
+        
+        # Quantizing against a fixed palette is much cheaper than letting the
+        # GIF encoder build an adaptive one per frame
+        gif_palette = self._build_gif_palette(viridis_lut)
             
-            # Viridis-like colormap for the probability field
-            def viridis_like(value):
-                r = int(255 * (0.4 + 0.6 * value))
-                g = int(255 * (0.2 + 0.8 * math.sqrt(value)))
-                b = int(255 * (0.5 + 0.5 * value))
-                return (r, g, b)
-                
+        # Layout of the left (component bars) and right (quantum field) panels
+        bar_width = 60
+        bar_height = 150
+        bar_x_start = 30
+        bar_y_base = 250
+        
+        cell_size = 25
+        field_size = 10
+        field_x_start = 600
+        field_y_start = 100
+        field_x_end = field_x_start + field_size * cell_size
+        field_y_end = field_y_start + field_size * cell_size
+        
+        # Render everything that is identical across frames once
+        self._bg = Image.new('RGB', (900, 400), color=(255, 255, 255))
+        bg_draw = ImageDraw.Draw(self._bg)
+        
+        # Draw title
+        bg_draw.text((400, 20), "Quantum Circuit Simulation with Reset", 
+                     fill=(0, 0, 0), font=title_font, anchor="ms")
+        
+        # Panel headers
+        bg_draw.text((150, 50), "Circuit Components", fill=(0, 0, 0), font=title_font, anchor="ms")
+        bg_draw.text((725, 50), "Quantum Probability Field", fill=(0, 0, 0), font=title_font, anchor="ms")
+        
+        # Component names under their bars
+        for i, component in enumerate(self.components):
+            bar_x = bar_x_start + i * (bar_width + 10)
+            name = component.name.replace(" ", "\n")
+            bg_draw.text((bar_x + bar_width//2, bar_y_base + 10), name, 
+                         fill=(0, 0, 0), font=font, anchor="ma")
+        
+        # Add labels for the coordinate system
+        # Bottom-left corner now has (-1, -1)
+        bg_draw.text((field_x_start - 15, field_y_end + 5), 
+                     "(-1, -1)", fill=(0, 0, 0), font=font, anchor="lt")
+        
+        # Top-right corner has (1, 1)
+        bg_draw.text((field_x_end + 5, field_y_start - 5), 
+                     "(1, 1)", fill=(0, 0, 0), font=font, anchor="lb")
+        self._bg_arr = np.asarray(self._bg)
+        
+        # Reusable frame buffer for everything that is a solid fill
+        canvas = np.empty((400, 900, 3), dtype=np.uint8)
+        
+        # Frame geometry in the form the render kernel expects
+        bar_xs = [bar_x_start + i * (bar_width + 10) for i in range(len(self.components))]
+        bar_specs = np.array([(x, x + bar_width, bar_y_base, bar_y_base - bar_height, bar_y_base - bar_height // 3)
+                              for x in bar_xs], dtype=np.int64)
+        field_box = np.array([field_x_start, field_y_start, cell_size], dtype=np.int64)
+        
+        # One frame image and draw context, refilled from the canvas every frame
+        self._frame_img = Image.new('RGB', (900, 400), color=(255, 255, 255))
+        self._frame_draw = ImageDraw.Draw(self._frame_img)
+        img = self._frame_img
+        draw = self._frame_draw
+            
+        # Frames are produced lazily and written out by the GIF writer one at
+        # a time, so memory use does not grow with max_frames
+        def render_frames():
+            nonlocal frame_count, final_state_frames
             while frame_count < self.max_frames:
                 # Update simulation
-                self.update_simulation(self.dt)
-                
-                # Create a new image for this frame
-                img = Image.new('RGB', (900, 400), color=(255, 255, 255))
-                draw = ImageDraw.Draw(img)
+                self.update_simulation(self.dt, frame_count)
+            
+                # Solid fills are drawn by the compiled kernel
+                for i, component in enumerate(self.components):
+                    state = component.state
+                    active_flags[i] = state is ON or state is ACTIVE or state is CLOSED
+                field_idx = (self.quantum_box.probability_field * 255).astype(np.uint8)
+                # Rows are flipped so the bottom-left of the tile is (-1, -1)
+                field_rgb = viridis_lut[field_idx[::-1]]
                 
-                # Draw title
-                draw.text((400, 20), "Quantum Circuit Simulation with Reset", 
-                          fill=(0, 0, 0), font=title_font, anchor="ms")
+                # Map p and t from [-1, 1] to pixel coordinates
+                # For p (x-axis): -1 -> 0, 1 -> field_size * cell_size
+                p_pixel = field_x_start + int((self.quantum_box.p + 1) / 2 * field_size * cell_size)
+            
+                # For t (y-axis): -1 -> field_size * cell_size, 1 -> 0 (flipped)
+                t_pixel = field_y_start + int((1 - (self.quantum_box.t + 1) / 2) * field_size * cell_size)
                 
+                _render_frame(canvas, self._bg_arr, field_rgb, field_box, active_flags, bar_specs,
+                              p_pixel, t_pixel)
+            
+                # Only text and the final-state banner are left to PIL
+                img.frombytes(canvas)
+            
                 # Draw component states (Left panel)
-                draw.text((150, 50), "Circuit Components", fill=(0, 0, 0), font=title_font, anchor="ms")
                 if self.quantum_box.simulation_stopped:
                     draw.text((150, 70), f"FINAL STATE", fill=(0, 100, 0), font=font, anchor="ms")
                 else:
                     draw.text((150, 70), f"Resets: {self.quantum_box.reset_count}", fill=(0, 0, 0), font=font, anchor="ms")
-                
-                # Draw component bars
-                bar_width = 60
-                bar_height = 150
-                bar_x_start = 30
-                bar_y_base = 250
-                
-                for i, component in enumerate(self.components):
-                    # Determine if component is active
-                    is_active = component.state in [ComponentState.ON, ComponentState.ACTIVE, ComponentState.CLOSED]
-                    color = (0, 150, 0) if is_active else (200, 0, 0)
-                    
-                    # Draw the bar
-                    bar_x = bar_x_start + i * (bar_width + 10)
-                    bar_height_actual = bar_height if is_active else bar_height // 3
-                    draw.rectangle([bar_x, bar_y_base - bar_height_actual, bar_x + bar_width, bar_y_base], 
-                                  fill=color, outline=(0, 0, 0))
-                    
-                    # Draw component name
-                    name = component.name.replace(" ", "\n")
-                    draw.text((bar_x + bar_width//2, bar_y_base + 10), name, 
-                             fill=(0, 0, 0), font=font, anchor="ma")
-                
+            
                 # Draw quantum field (Right panel)
-                draw.text((725, 50), "Quantum Probability Field", fill=(0, 0, 0), font=title_font, anchor="ms")
-                
                 if self.quantum_box.simulation_stopped:
                     draw.text((725, 70), f"FINAL STATE REACHED", fill=(0, 100, 0), font=font, anchor="ms")
                 else:
                     draw.text((725, 70), f"p={self.quantum_box.p:.2f}, t={self.quantum_box.t:.2f}", 
                              fill=(0, 0, 0), font=font, anchor="ms")
-                
-                # Draw probability field as a grid of colored cells
-                cell_size = 25
-                field_size = 10
-                field_x_start = 600
-                field_y_start = 100
-                
-                # Add labels for the coordinate system
-                # Bottom-left corner now has (-1, -1)
-                draw.text((field_x_start - 15, field_y_start + field_size * cell_size + 5), 
-                         "(-1, -1)", fill=(0, 0, 0), font=font, anchor="lt")
-                
-                # Top-right corner has (1, 1)
-                draw.text((field_x_start + field_size * cell_size + 5, field_y_start - 5), 
-                         "(1, 1)", fill=(0, 0, 0), font=font, anchor="lb")
-                
-                for i in range(field_size):
-                    for j in range(field_size):
-                        # Modified to flip the y-axis so bottom-left is (-1, -1)
-                        # j corresponds to x-axis, 0 -> -1, 9 -> 1
-                        # i corresponds to y-axis, 0 -> 1, 9 -> -1 (flipped)
-                        # So we need to use (9 - i) to flip vertical axis
-                        value = self.quantum_box.probability_field[field_size - 1 - i, j]
-                        color = viridis_like(value)
-                        x = field_x_start + j * cell_size
-                        y = field_y_start + i * cell_size
-                        draw.rectangle([x, y, x + cell_size, y + cell_size], fill=color, outline=(200, 200, 200))
-                
-                # Draw p and t coordinate lines
-                # Map from [-1, 1] to pixel coordinates
-                # For p (x-axis): -1 -> 0, 1 -> field_size * cell_size
-                p_pixel = field_x_start + int((self.quantum_box.p + 1) / 2 * field_size * cell_size)
-                
-                # For t (y-axis): -1 -> field_size * cell_size, 1 -> 0 (flipped)
-                t_pixel = field_y_start + int((1 - (self.quantum_box.t + 1) / 2) * field_size * cell_size)
-                
-                # Draw coordinate lines
-                draw.line([p_pixel, field_y_start, p_pixel, field_y_start + field_size * cell_size], 
-                         fill=(255, 0, 0), width=2)
-                draw.line([field_x_start, t_pixel, field_x_start + field_size * cell_size, t_pixel], 
-                         fill=(255, 0, 0), width=2)
-                
-                # Draw boundary lines
-                boundary_p = field_x_start + field_size * cell_size
-                boundary_t = field_y_start + field_size * cell_size
-                draw.line([boundary_p, field_y_start, boundary_p, boundary_t], fill=(0, 0, 255), width=2)
-                draw.line([field_x_start, field_y_start, boundary_p, field_y_start], fill=(0, 0, 255), width=2)
-                
+            
                 # Draw reset count
                 reset_text = f"Resets: {self.quantum_box.reset_count}\n"
                 reset_text += f"p-resets: {self.quantum_box.p_reset_count}\n"
                 reset_text += f"t-resets: {self.quantum_box.t_reset_count}"
                 draw.text((850, 350), reset_text, fill=(0, 0, 0), font=font, anchor="rs")
-                
+            
                 # Draw final state message
                 if self.quantum_box.simulation_stopped:
                     draw.rectangle([500, 150, 700, 200], fill=(0, 150, 0, 128), outline=(0, 0, 0))
                     draw.text((600, 175), "FINAL STATE REACHED!\np=1 AND t=1", 
                              fill=(255, 255, 255), font=title_font, anchor="ms")
                     final_state_frames += 1
-                
+            
                 # Draw frame number
                 draw.text((20, 380), f"Frame: {frame_count}", fill=(100, 100, 100), font=font)
-                
-                # Append the frame
-                frames.append(img)
+            
+                # Hand the frame to the GIF writer, already in the shared palette
+                frame = img.quantize(palette=gif_palette, dither=Image.Dither.NONE)
+                yield frame
                 frame_count += 1
-                
-                # Print progress
-                if frame_count % 10 == 0:
-                    print(f"Generated frame {frame_count}/{self.max_frames}")
-                
-                # Check if we've shown enough frames after final state
-                if self.quantum_box.simulation_stopped and final_state_frames >= self.frames_after_final_state:
+            
+                # Once the final state is reached, hold this frame for the remaining
+                # frames instead of redrawing it (the GIF writer merges identical
+                # consecutive frames into one longer frame)
+                if self.quantum_box.simulation_stopped:
+                    while final_state_frames < self.frames_after_final_state and frame_count < self.max_frames:
+                        yield frame
+                        final_state_frames += 1
+                        frame_count += 1
                     print(f"Final state reached, stopping after {final_state_frames} additional frames")
                     break
-            
-            # Save as GIF
-            print(f"Saving GIF with {len(frames)} frames...")
-            frames[0].save(
-                output_gif_path,
-                save_all=True,
-                append_images=frames[1:],
-                optimize=False,
-                duration=150,
-                loop=0
-            )
-            print(f"GIF saved to: {output_gif_path}")
-            
-        except Exception as e:
-            print(f"Error creating GIF: {e}")
-            import traceback
-            traceback.print_exc()
+        
+        # Save as GIF into a temporary file next to the target, which only
+        # replaces the previous output once the GIF is complete
+        tmp_path = output_gif_path + ".part"
+        try:
+            with open(tmp_path, "wb") as fp:
+                writer = _GifStreamWriter(fp, duration=150, loop=0)
+                for frame in render_frames():
+                    writer.append(frame)
+                writer.close()
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, output_gif_path)
+        print(f"Saved GIF with {frame_count} frames")
+        print(f"GIF saved to: {output_gif_path}")
 
 # Run the simulation and create GIF
 if __name__ == "__main__":
@@ -485,8 +747,6 @@ if __name__ == "__main__":
     print("- Simulation will stop only when p=1 AND t=1 occur simultaneously")
     print("- Creating GIF of the simulation...")
     
-    # Set random seed for reproducibility but with an interesting path
-    random.seed(42)
-    
-    simulation = CircuitSimulation()
+    # Fixed seed for reproducibility but with an interesting path
+    simulation = CircuitSimulation(seed=42)
     simulation.run_simulation_for_gif()
\ No newline at end of file